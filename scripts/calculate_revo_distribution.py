@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Derive the REVO token distribution from combined wallet USD values.
+
+Reads the output of combine_wallet_values.py and allocates REVO to each
+wallet at the given REVO/USD price. The resulting distribution file feeds
+the genesis config generator.
+"""
+
+import argparse
+import logging
+import mmap
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+import orjson
+
+logger = logging.getLogger("calculate_revo_distribution")
+
+# Fixed-point scale for the per-wallet math: 18 decimals of precision.
+SCALE = 10 ** 18
+
+
+def load_combined_data(path):
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return orjson.loads(memoryview(buf))
+        finally:
+            buf.close()
+
+
+def _format_scaled(value):
+    """Render a SCALE-scaled int as a decimal string."""
+    whole, frac = divmod(value, SCALE)
+    if frac == 0:
+        return str(whole)
+    return "{}.{:018d}".format(whole, frac).rstrip("0")
+
+
+def calculate_revo_distribution(combined_data, revo_price):
+    """Allocate REVO per wallet pro rata to its USD value.
+
+    The per-wallet division runs on fixed-point ints: both USD value and
+    price are scaled by 10**18, so `usd * SCALE // price` keeps full
+    18-decimal precision without 28-digit Decimal division in the loop.
+    """
+    wallets = combined_data["wallets"]
+    distribution = {}
+    total_usd_scaled = 0
+    total_revo_scaled = 0
+    price_scaled = int(Decimal(str(revo_price)) * SCALE)
+    for address, wallet_data in wallets.items():
+        usd_scaled = int(Decimal(wallet_data["usd_value"]) * SCALE)
+        revo_scaled = usd_scaled * SCALE // price_scaled
+        distribution[address] = {
+            "usd_value": _format_scaled(usd_scaled),
+            "revo_tokens": _format_scaled(revo_scaled),
+        }
+        total_usd_scaled += usd_scaled
+        total_revo_scaled += revo_scaled
+    return (distribution, _format_scaled(total_usd_scaled),
+            _format_scaled(total_revo_scaled))
+
+
+def calculate_revo_distribution_numpy(combined_data, revo_price):
+    """Vectorized float64 variant of the allocation (--approx).
+
+    One SIMD divide across all wallets instead of a Python-level loop.
+    Relative error is bounded by float64 (~1e-15), which is fine for
+    reporting runs but not for the canonical genesis distribution.
+    """
+    wallets = combined_data["wallets"]
+    addresses = list(wallets)
+    usd = np.fromiter(
+        (float(wallets[a]["usd_value"]) for a in addresses),
+        dtype=np.float64,
+        count=len(addresses),
+    )
+    revo = usd / revo_price
+    # Fixed-point rendering: repr(float) switches to exponent notation
+    # outside [1e-4, 1e16), which the genesis generator's integer
+    # string parsers reject.
+    fmt = np.format_float_positional
+    distribution = {
+        address: {"usd_value": fmt(u, trim="-"),
+                  "revo_tokens": fmt(r, trim="-")}
+        for address, u, r in zip(addresses, usd.tolist(), revo.tolist())
+    }
+    return distribution, fmt(float(usd.sum()), trim="-"), \
+        fmt(float(revo.sum()), trim="-")
+
+
+def save_revo_distribution(distribution, totals, revo_price, output_file):
+    total_usd, total_revo = totals
+    data = {
+        "metadata": {
+            "revo_price_usd": str(revo_price),
+            "total_usd_value": str(total_usd),
+            "total_revo_tokens": str(total_revo),
+            "total_wallets": len(distribution),
+            "generated_at": int(time.time()),
+        },
+        "wallets": distribution,
+    }
+    with open(output_file, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2, default=str))
+    logger.info("Saved REVO distribution for %d wallets to %s",
+                len(distribution), output_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calculate the REVO distribution")
+    parser.add_argument("--input", default="combined_wallet_values.json")
+    parser.add_argument("--output", default="revo_distribution.json")
+    parser.add_argument("--revo-price", type=float, required=True,
+                        help="REVO price in USD used for the allocation")
+    parser.add_argument("--approx", action="store_true",
+                        help="use the vectorized float64 path (faster on "
+                             "very large wallet sets, ~1e-15 relative error)")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    combined_data = load_combined_data(args.input)
+    if args.approx:
+        distribution, total_usd, total_revo = calculate_revo_distribution_numpy(
+            combined_data, args.revo_price
+        )
+    else:
+        distribution, total_usd, total_revo = calculate_revo_distribution(
+            combined_data, args.revo_price
+        )
+    save_revo_distribution(distribution, (total_usd, total_revo),
+                           args.revo_price, args.output)
+
+    logger.info("Wallets: %d", len(distribution))
+    logger.info("Total USD: %s", total_usd)
+    logger.info("Total REVO: %s", total_revo)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
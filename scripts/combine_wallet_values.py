@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Combine CXS and NEXTEP wallet snapshots into per-address USD values.
+
+Takes the JSON snapshots produced by the balance-fetch scripts, merges
+them over the union of addresses, and prices each wallet in USD so the
+REVO distribution can be derived from a single combined file.
+"""
+
+import argparse
+import logging
+import mmap
+import sys
+import time
+from decimal import Decimal
+
+import orjson
+
+from fetch_cxs_price import get_price
+
+logger = logging.getLogger("combine_wallet_values")
+
+WEI = 10 ** 18
+
+_price_cache = {}
+
+
+def get_token_price(token_symbol):
+    """Fetch the USD price for a token, in-process and cached per symbol."""
+    price = _price_cache.get(token_symbol)
+    if price is None:
+        price = get_price(token_symbol)
+        _price_cache[token_symbol] = price
+    return price
+
+
+def load_wallet_data(path):
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return orjson.loads(memoryview(buf))
+        finally:
+            buf.close()
+
+
+def combine_wallet_values(cxs_data, nextep_data, cxs_price, nextep_price):
+    """Merge the two wallet sets in one pass over the union of addresses.
+
+    Balances stay native int wei until the single USD conversion per merged
+    entry, so no per-wallet Decimal churn and no duplicate-key second pass.
+    """
+    cxs_bal = {a: int(w["balance_wei"]) for a, w in cxs_data["wallets"].items()}
+    nextep_bal = {a: int(w["balance_wei"]) for a, w in nextep_data["wallets"].items()}
+
+    combined = {}
+    for address in cxs_bal.keys() | nextep_bal.keys():
+        cxs_wei = cxs_bal.get(address, 0)
+        nextep_wei = nextep_bal.get(address, 0)
+        usd_value = (
+            Decimal(cxs_wei) * cxs_price + Decimal(nextep_wei) * nextep_price
+        ) / WEI
+        combined[address] = {
+            "cxs_balance_wei": str(cxs_wei),
+            "nextep_balance_wei": str(nextep_wei),
+            "usd_value": str(usd_value),
+        }
+    return combined
+
+
+def calculate_totals(combined):
+    total_cxs_wei = sum(int(w["cxs_balance_wei"]) for w in combined.values())
+    total_nextep_wei = sum(int(w["nextep_balance_wei"]) for w in combined.values())
+    total_usd = sum(Decimal(w["usd_value"]) for w in combined.values())
+    return total_cxs_wei, total_nextep_wei, total_usd
+
+
+def save_combined_data(combined, totals, cxs_price, nextep_price, output_file):
+    total_cxs_wei, total_nextep_wei, total_usd = totals
+    data = {
+        "metadata": {
+            "cxs_price_usd": str(cxs_price),
+            "nextep_price_usd": str(nextep_price),
+            "total_cxs_wei": str(total_cxs_wei),
+            "total_nextep_wei": str(total_nextep_wei),
+            "total_usd_value": str(total_usd),
+            "total_wallets": len(combined),
+            "generated_at": int(time.time()),
+        },
+        "wallets": combined,
+    }
+    with open(output_file, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2, default=str))
+    logger.info("Saved %d combined wallets to %s", len(combined), output_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Combine CXS and NEXTEP wallet values")
+    parser.add_argument("--cxs-wallets", default="cxs_balances.json")
+    parser.add_argument("--nextep-wallets", default="nextep_balances.json")
+    parser.add_argument("--output", default="combined_wallet_values.json")
+    parser.add_argument("--min-usd", type=float, default=0.0,
+                        help="drop wallets below this combined USD value")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    cxs_price = get_token_price("CXS")
+    nextep_price = get_token_price("NEXTEP")
+    logger.info("CXS price: %s USD, NEXTEP price: %s USD", cxs_price, nextep_price)
+
+    cxs_data = load_wallet_data(args.cxs_wallets)
+    nextep_data = load_wallet_data(args.nextep_wallets)
+
+    combined = combine_wallet_values(cxs_data, nextep_data, cxs_price, nextep_price)
+
+    if args.min_usd > 0:
+        min_usd_dec = Decimal(str(args.min_usd))
+        combined = {
+            a: w
+            for a, w in combined.items()
+            if Decimal(w["usd_value"]) >= min_usd_dec
+        }
+
+    totals = calculate_totals(combined)
+    save_combined_data(combined, totals, cxs_price, nextep_price, args.output)
+
+    logger.info("Wallets: %d", len(combined))
+    logger.info("Total USD value: %s", totals[2])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
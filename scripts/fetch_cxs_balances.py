@@ -0,0 +1,658 @@
+#!/usr/bin/env python3
+"""Snapshot native CXS balances for every wallet active on the chain.
+
+Crawls the Ethernal transaction API to find every address that ever sent,
+received, or was touched by a transfer (including MultiSend fan-outs and
+ERC20-style transfer calls), then queries the native balance of each
+active wallet over JSON-RPC. Output feeds combine_wallet_values.py.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import httpx
+import numpy as np
+import orjson
+from eth_abi import abi as eth_abi
+from eth_utils import to_checksum_address
+from tqdm import tqdm
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - numba is optional
+    njit = None
+
+logger = logging.getLogger("fetch_cxs_balances")
+
+TRANSACTIONS_API_URL = "https://api.tryethernal.com/api/transactions"
+MULTISEND_CONTRACT_ADDRESS = "0x7c6C2BbE58B4B9dB30c82E574562c6AD4aCA5C18"
+
+# keccak("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+CXS_WEI = 10 ** 18
+
+# Canonical Multicall3 deployment; one eth_call returns a whole chunk of
+# native balances via getEthBalance instead of N eth_getBalance calls.
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+_AGGREGATE3_SELECTOR = bytes.fromhex("82ad56cb")   # aggregate3((address,bool,bytes)[])
+_GET_ETH_BALANCE_SELECTOR = bytes.fromhex("4d2301cc")  # getEthBalance(address)
+
+def _make_async_client():
+    """HTTP/2 client shared by a whole crawl or fetch phase.
+
+    Multiplexed streams over a handful of keep-alive connections replace
+    one OS thread + TLS handshake per concurrent request.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=30.0,
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+        transport=httpx.AsyncHTTPTransport(retries=3),
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+
+class RateLimiter:
+    """Thread-safe token bucket keeping requests below a per-minute cap.
+
+    Safe to share across worker threads: bucket state is mutated under a
+    lock, the sleep happens outside it.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.capacity = requests_per_minute
+        self.rate = requests_per_minute / 60.0
+        self.tokens = float(requests_per_minute)
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        # Take the token under the lock before sleeping; the count may
+        # go negative, so each concurrent waiter books a progressively
+        # later slot instead of every waiter waking at the same
+        # deadline and all proceeding at once.
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def wait_if_needed(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def wait_if_needed_async(self):
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+async def afetch_transactions(client, page, items_per_page, rate_limiter):
+    """Fetch one page of transactions from the Ethernal API."""
+    await rate_limiter.wait_if_needed_async()
+    response = await client.get(
+        TRANSACTIONS_API_URL,
+        params={"page": page, "itemsPerPage": items_per_page},
+    )
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+    return data.get("items", [])
+
+
+async def _probe_total(client, rate_limiter):
+    """Ask the API how many transactions exist; None if it won't say."""
+    try:
+        await rate_limiter.wait_if_needed_async()
+        response = await client.get(
+            TRANSACTIONS_API_URL,
+            params={"page": 1, "itemsPerPage": 1, "withCount": "true"},
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content).get("total")
+    except Exception:
+        return None
+
+
+async def _crawl_pages(items_per_page, rpm, out_queue, max_workers=8):
+    rate_limiter = RateLimiter(rpm)
+    async with _make_async_client() as client:
+        count = await _probe_total(client, rate_limiter)
+        if count is None:
+            # Unknown page count: walk pages serially until one is empty.
+            page = 1
+            total = 0
+            while True:
+                transactions = await afetch_transactions(client, page,
+                                                         items_per_page,
+                                                         rate_limiter)
+                if not transactions:
+                    break
+                total += len(transactions)
+                logger.info("Fetched page %d (%d transactions total)",
+                            page, total)
+                await asyncio.to_thread(out_queue.put, transactions)
+                page += 1
+            return
+        # Known count: fan out all pages at once, bounded by the
+        # semaphore and the shared rate limiter, instead of paying one
+        # sequential round trip per page.
+        n_pages = -(-count // items_per_page)
+        logger.info("API reports %d transactions (%d pages)", count, n_pages)
+        sem = asyncio.Semaphore(max_workers)
+
+        async def fetch_page(page):
+            async with sem:
+                return await afetch_transactions(client, page, items_per_page,
+                                                 rate_limiter)
+
+        tasks = [asyncio.ensure_future(fetch_page(page))
+                 for page in range(1, n_pages + 1)]
+        total = 0
+        for task in asyncio.as_completed(tasks):
+            transactions = await task
+            if transactions:
+                total += len(transactions)
+                logger.info("Fetched %d/%d transactions", total, count)
+                await asyncio.to_thread(out_queue.put, transactions)
+
+
+def fetch_transaction_pages(items_per_page, rpm, out_queue):
+    """Crawl all transaction pages, pushing each one onto out_queue.
+
+    Runs its own event loop; pages stream to the consumer as they land,
+    so peak memory stays at a few pages regardless of chain size. When
+    the API exposes a total count the pages are fetched concurrently.
+    """
+    asyncio.run(_crawl_pages(items_per_page, rpm, out_queue))
+
+
+def _parse_multisend_py(buf):
+    """Copy the MultiSend recipient address bytes out of raw calldata.
+
+    `buf` is the calldata with the "0x" prefix and 4-byte selector already
+    stripped. Returns a (n, 20) uint8 array of address bytes.
+    """
+    offset = int.from_bytes(bytes(buf[32:64]), "big")
+    if offset + 32 > len(buf):
+        return np.empty((0, 20), dtype=np.uint8)
+    length = int.from_bytes(bytes(buf[offset:offset + 32]), "big")
+    base = offset + 32
+    if base + length * 32 > len(buf):
+        return np.empty((0, 20), dtype=np.uint8)
+    out = np.empty((length, 20), dtype=np.uint8)
+    for i in range(length):
+        word = base + i * 32
+        out[i, :] = buf[word + 12:word + 32]
+    return out
+
+
+if njit is not None:
+    # LLVM-compiled copy loop over contiguous uint8 memory; the big-endian
+    # word reads are unrolled by hand since int.from_bytes is unsupported
+    # in nopython mode.
+    @njit(cache=True)
+    def _parse_multisend_nb(buf):  # pragma: no cover - exercised via numba
+        n = buf.shape[0]
+        offset = 0
+        for i in range(56, 64):  # low 8 bytes of the offset word
+            offset = (offset << 8) | buf[i]
+        if offset + 32 > n:
+            return np.empty((0, 20), dtype=np.uint8)
+        length = 0
+        for i in range(offset + 24, offset + 32):
+            length = (length << 8) | buf[i]
+        base = offset + 32
+        if base + length * 32 > n:
+            return np.empty((0, 20), dtype=np.uint8)
+        out = np.empty((length, 20), dtype=np.uint8)
+        for i in range(length):
+            word = base + i * 32
+            for j in range(20):
+                out[i, j] = buf[word + 12 + j]
+        return out
+
+    _parse_multisend = _parse_multisend_nb
+else:
+    _parse_multisend = _parse_multisend_py
+
+
+def decode_multisend_data(data):
+    """Decode the recipient address list from a MultiSend call's calldata.
+
+    The hex payload is converted to bytes once up front, then the address
+    words are copied out by _parse_multisend — the Numba-compiled kernel
+    when numba is installed, a plain-Python equivalent otherwise. Returns
+    a list of 20-byte address values.
+    """
+    if not data or len(data) < 138:
+        return []
+    try:
+        raw = np.frombuffer(bytes.fromhex(data[10:]), dtype=np.uint8)
+    except ValueError:
+        return []
+    addresses = _parse_multisend(raw)
+    return [addresses[i].tobytes() for i in range(addresses.shape[0])]
+
+
+def _h_transfer(data, out):
+    """transfer(address,uint256): recipient in the first argument word.
+
+    Calldata is untrusted chain data: short or non-hex payloads are
+    dropped rather than raising mid-crawl or seeding the set with
+    values that are not 20-byte addresses.
+    """
+    if len(data) < 74:
+        return
+    try:
+        out.add(bytes.fromhex(data[34:74]))
+    except ValueError:
+        pass
+
+
+def _h_transfer_from(data, out):
+    """transferFrom(address,address,uint256): sender and recipient words."""
+    if len(data) < 138:
+        return
+    try:
+        out.add(bytes.fromhex(data[34:74]))
+        out.add(bytes.fromhex(data[98:138]))
+    except ValueError:
+        pass
+
+
+# 4-byte selector ("0x" + 8 hex chars) -> calldata handler. One hashed
+# lookup per transaction instead of a startswith ladder that grows with
+# every selector we care about.
+SELECTOR_HANDLERS = {
+    "0xa9059cbb": _h_transfer,
+    "0x23b872dd": _h_transfer_from,
+}
+
+# startswith over a tuple walks the prefixes in C; gating on it means the
+# common case (calldata we don't handle) never allocates the selector
+# slice or probes the dict.
+SEL_PREFIXES = tuple(SELECTOR_HANDLERS)
+
+# Sentinel values that decode helpers can produce but are never real
+# wallets: malformed/empty addresses and the zero address.
+BLACKLIST = frozenset({b"", b"\x00" * 20})
+
+
+@lru_cache(maxsize=None)
+def checksum(address):
+    """Memoized EIP-55 checksum: one Keccak per distinct address."""
+    return to_checksum_address(address)
+
+
+def update_active_wallets(transactions, active_wallets):
+    """Add every wallet address touched by the given transactions to the set.
+
+    This pass is pure Python and CPU-bound, so the loop body keeps every
+    constant and method lookup hoisted into locals: no per-transaction
+    `.lower()` on constants, one `tx.get` binding, and `set.update`
+    instead of repeated `.add` calls. Calldata handlers are dispatched
+    on the 4-byte selector through SELECTOR_HANDLERS.
+
+    Addresses are stored as 20-byte values — roughly 40% less resident
+    memory than lowercased hex strings at 10M+ wallets, with faster set
+    hashing — and only rendered back to hex when written out.
+    """
+    add = active_wallets.add
+    update = active_wallets.update
+    multisend = bytes.fromhex(MULTISEND_CONTRACT_ADDRESS[2:])
+    handlers = SELECTOR_HANDLERS
+
+    # The same hot wallets and log topics recur thousands of times across a
+    # chain's history; canonicalizing through a cache turns the repeat case
+    # into a dict hit instead of allocating a fresh lowered string each time.
+    canon_cache = {}
+
+    def canon(raw):
+        cached = canon_cache.get(raw)
+        if cached is None:
+            try:
+                cached = bytes.fromhex(raw[2:] if raw[:2] == "0x" else raw)
+            except ValueError:
+                cached = b""
+            canon_cache[raw] = cached
+        return cached
+
+    topic_cache = {}
+
+    def topic_addr(topic):
+        cached = topic_cache.get(topic)
+        if cached is None:
+            cached = topic_cache.setdefault(topic,
+                                            bytes.fromhex(topic[26:]))
+        return cached
+
+    # Default tqdm repaints every ~100ms; on millions of rows that is a
+    # measurable share of the loop. Update at most once a second, in
+    # coarse steps, and not at all when stderr is not a terminal.
+    for tx in tqdm(transactions, desc="Extracting wallets", mininterval=1.0,
+                   miniters=1000, disable=not sys.stderr.isatty()):
+        get = tx.get
+        from_addr = get("from")
+        if from_addr:
+            add(canon(from_addr))
+        to_addr = get("to")
+        if to_addr:
+            to_addr = canon(to_addr)
+            add(to_addr)
+
+        data = get("input") or get("data") or ""
+        if to_addr == multisend:
+            update(decode_multisend_data(data))
+        if data and data.startswith(SEL_PREFIXES):
+            handlers[data[:10]](data, active_wallets)
+
+        receipt = get("receipt")
+        logs = receipt.get("logs") if receipt else None
+        if logs:
+            for log in logs:
+                topics = log.get("topics")
+                if topics and len(topics) >= 3 and topics[0] == TRANSFER_TOPIC:
+                    add(topic_addr(topics[1]))
+                    add(topic_addr(topics[2]))
+
+    active_wallets.difference_update(BLACKLIST)
+
+
+_multicall_available = True
+
+
+async def _afetch_balance_batch_multicall(client, rpc_url, batch, rate_limiter):
+    """Fetch a whole batch of native balances with one eth_call.
+
+    Encodes aggregate3 with a getEthBalance sub-call per address, so the
+    node does all the state reads internally and the wire carries a single
+    request/response pair per batch.
+    """
+    calls = [
+        (MULTICALL3_ADDRESS,
+         True,
+         _GET_ETH_BALANCE_SELECTOR
+         + eth_abi.encode(["address"], [checksum(address)]))
+        for address in batch
+    ]
+    calldata = _AGGREGATE3_SELECTOR + eth_abi.encode(
+        ["(address,bool,bytes)[]"], [calls])
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "eth_call",
+        "params": [{"to": MULTICALL3_ADDRESS, "data": "0x" + calldata.hex()},
+                   "latest"],
+    }
+    await rate_limiter.wait_if_needed_async()
+    reply = orjson.loads((await client.post(rpc_url, json=payload)).content)
+    if "result" not in reply:
+        raise RuntimeError(reply.get("error", "eth_call failed"))
+    (results,) = eth_abi.decode(
+        ["(bool,bytes)[]"], bytes.fromhex(reply["result"][2:]))
+    return [
+        (address, int.from_bytes(returndata, "big") if success else 0)
+        for address, (success, returndata) in zip(batch, results)
+    ]
+
+
+async def _afetch_balance_batch(client, rpc_url, batch, rate_limiter, sem):
+    global _multicall_available
+    async with sem:
+        if _multicall_available:
+            try:
+                return await _afetch_balance_batch_multicall(
+                    client, rpc_url, batch, rate_limiter)
+            except Exception as exc:
+                # No Multicall3 on this chain (or the call reverted): drop
+                # to batched eth_getBalance for the rest of the run.
+                logger.warning("Multicall3 unavailable (%s); falling back to "
+                               "eth_getBalance batches", exc)
+                _multicall_available = False
+        payload = [
+            {
+                "jsonrpc": "2.0",
+                "id": i,
+                "method": "eth_getBalance",
+                "params": [checksum(address), "latest"],
+            }
+            for i, address in enumerate(batch)
+        ]
+        await rate_limiter.wait_if_needed_async()
+        replies = orjson.loads((await client.post(rpc_url, json=payload)).content)
+        if isinstance(replies, dict):
+            # Node rejected the batch; fall back to one call per address.
+            replies = []
+            for i, address in enumerate(batch):
+                await rate_limiter.wait_if_needed_async()
+                reply = orjson.loads(
+                    (await client.post(rpc_url, json=payload[i])).content)
+                reply["id"] = i
+                replies.append(reply)
+        return [(batch[reply["id"]], int(reply["result"], 16))
+                for reply in replies]
+
+
+async def _snapshot_block(client, rpc_url):
+    reply = orjson.loads((await client.post(rpc_url, json={
+        "jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": [],
+    })).content)
+    return int(reply["result"], 16)
+
+
+async def _fetch_balances_async(addresses, rpc_url, batch_size, rpm, balances,
+                                output_file, save_interval, max_workers,
+                                cache_path):
+    rate_limiter = RateLimiter(rpm)
+    sem = asyncio.Semaphore(max_workers)
+    async with _make_async_client() as client:
+        block = await _snapshot_block(client, rpc_url)
+        logger.info("Snapshotting balances at block %d", block)
+        db = sqlite3.connect(cache_path)
+        db.execute("CREATE TABLE IF NOT EXISTS bal ("
+                   "addr TEXT NOT NULL, block INTEGER NOT NULL, "
+                   "wei TEXT NOT NULL, PRIMARY KEY (addr, block))")
+        cached = 0
+        for addr, wei in db.execute("SELECT addr, wei FROM bal WHERE block=?",
+                                    (block,)):
+            if addr not in balances:
+                balances[addr] = int(wei)
+                cached += 1
+        if cached:
+            logger.info("Loaded %d balances from %s", cached, cache_path)
+
+        remaining = [a for a in addresses if a not in balances]
+        batches = [remaining[i:i + batch_size]
+                   for i in range(0, len(remaining), batch_size)]
+        processed = 0
+        pending_rows = []
+        tasks = [
+            asyncio.ensure_future(
+                _afetch_balance_batch(client, rpc_url, batch, rate_limiter,
+                                      sem))
+            for batch in batches
+        ]
+        with tqdm(total=len(remaining), desc="Fetching balances",
+                  mininterval=1.0,
+                  disable=not sys.stderr.isatty()) as progress:
+            for task in asyncio.as_completed(tasks):
+                results = await task
+                for address, balance_wei in results:
+                    balances[address] = balance_wei
+                    pending_rows.append((address, block, str(balance_wei)))
+                if len(pending_rows) >= 1000:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO bal VALUES (?,?,?)",
+                        pending_rows)
+                    db.commit()
+                    pending_rows.clear()
+                progress.update(len(results))
+                processed += len(results)
+                if processed % save_interval < batch_size:
+                    save_balances_to_file(addresses, balances, output_file,
+                                          complete=False)
+        if pending_rows:
+            db.executemany("INSERT OR REPLACE INTO bal VALUES (?,?,?)",
+                           pending_rows)
+            db.commit()
+        db.close()
+    return balances
+
+
+def fetch_cxs_balances(addresses, rpc_url, batch_size, rpm, balances,
+                       output_file, save_interval, max_workers=8,
+                       cache_path="balances.sqlite"):
+    """Fetch native balances with concurrent batched JSON-RPC requests.
+
+    Batches are posted as asyncio tasks over one HTTP/2 client, with an
+    asyncio.Semaphore bounding how many are in flight — multiplexed
+    streams replace the former thread pool at a fraction of the
+    per-request overhead. All tasks share the same token-bucket limiter.
+
+    Every fetched balance is recorded in a sqlite cache keyed by
+    (address, snapshot block), so a crashed or re-run snapshot at the same
+    block skips all rows it already has — including mid-batch progress the
+    JSON resume file never captured.
+    """
+    return asyncio.run(_fetch_balances_async(
+        addresses, rpc_url, batch_size, rpm, balances, output_file,
+        save_interval, max_workers, cache_path))
+
+
+def _format_wei(wei):
+    """Render an int wei amount as a whole-token decimal string."""
+    whole, frac = divmod(wei, CXS_WEI)
+    if frac == 0:
+        return str(whole)
+    return "{}.{:018d}".format(whole, frac).rstrip("0")
+
+
+def save_balances_to_file(wallet_list, balances, output_file, complete=True):
+    # Balances live as native ints, so the stats pass is pure int
+    # arithmetic — no Decimal construction per wallet.
+    addresses_with_balance = 0
+    total_wei = 0
+    for addr in wallet_list:
+        wei = balances.get(addr)
+        if wei:
+            addresses_with_balance += 1
+            total_wei += wei
+    metadata = {
+        "complete": complete,
+        "total_wallets": len(wallet_list),
+        "addresses_with_balance": addresses_with_balance,
+        "total_balance": _format_wei(total_wei),
+        "generated_at": int(time.time()),
+    }
+    # Stream the wallets object straight to disk: no second dict holding
+    # every entry, so peak memory during save stays at one wallet. The
+    # human-readable balance string is formatted here, at emission time.
+    with open(output_file, "wb") as f:
+        f.write(b'{"metadata":' + orjson.dumps(metadata) + b',"wallets":{')
+        sep = b""
+        for addr in wallet_list:
+            wei = balances.get(addr, 0)
+            entry = {"balance_wei": str(wei), "balance": _format_wei(wei)}
+            f.write(sep + orjson.dumps(addr) + b":" + orjson.dumps(entry))
+            sep = b","
+        f.write(b"}}")
+    logger.info("Saved %d wallets to %s", len(wallet_list), output_file)
+
+
+def save_to_file(active_wallets, output_file):
+    metadata = {
+        "total_wallets": len(active_wallets),
+        "generated_at": int(time.time()),
+    }
+    with open(output_file, "wb") as f:
+        f.write(b'{"metadata":' + orjson.dumps(metadata) + b',"wallets":[')
+        sep = b""
+        for addr in sorted("0x" + addr.hex() for addr in active_wallets):
+            f.write(sep + orjson.dumps(addr))
+            sep = b","
+        f.write(b"]}")
+    logger.info("Saved %d active wallets to %s", len(active_wallets), output_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch CXS balances of active wallets")
+    parser.add_argument("--rpc-url", default="http://127.0.0.1:9944")
+    parser.add_argument("--items-per-page", type=int, default=1000)
+    parser.add_argument("--api-rpm", type=int, default=120,
+                        help="Ethernal API request budget per minute")
+    parser.add_argument("--rpc-rpm", type=int, default=600,
+                        help="RPC request budget per minute")
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="eth_getBalance calls per JSON-RPC batch")
+    parser.add_argument("--output", default="cxs_balances.json")
+    parser.add_argument("--wallets-output", default="active_wallets.json")
+    parser.add_argument("--resume-balances", default=None,
+                        help="previous output file to resume from")
+    parser.add_argument("--save-interval", type=int, default=1000)
+    parser.add_argument("--max-workers", type=int, default=8,
+                        help="concurrent balance-batch requests")
+    parser.add_argument("--balance-cache", default="balances.sqlite",
+                        help="sqlite cache of fetched balances per block")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    # Producer/consumer: the API fetch runs in a worker thread and hands
+    # pages over a bounded queue, so extraction overlaps network I/O and
+    # memory stays flat at a few pages regardless of chain size.
+    active_wallets = set()
+    pages = queue.Queue(maxsize=4)
+
+    def _produce():
+        try:
+            fetch_transaction_pages(args.items_per_page, args.api_rpm, pages)
+        finally:
+            pages.put(None)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        producer = executor.submit(_produce)
+        while True:
+            transactions = pages.get()
+            if transactions is None:
+                break
+            update_active_wallets(transactions, active_wallets)
+        producer.result()  # surface fetch errors
+    logger.info("Found %d active wallets", len(active_wallets))
+    save_to_file(active_wallets, args.wallets_output)
+
+    balances = {}
+    if args.resume_balances:
+        with open(args.resume_balances) as f:
+            balances = {
+                addr: int(entry["balance_wei"])
+                for addr, entry in json.load(f).get("wallets", {}).items()
+            }
+        logger.info("Resumed %d balances from %s", len(balances),
+                    args.resume_balances)
+
+    wallet_list = sorted("0x" + addr.hex() for addr in active_wallets)
+    fetch_cxs_balances(wallet_list, args.rpc_url, args.batch_size, args.rpc_rpm,
+                       balances, args.output, args.save_interval,
+                       args.max_workers, args.balance_cache)
+    save_balances_to_file(wallet_list, balances, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
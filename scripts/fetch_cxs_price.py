@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Fetch current token USD prices from the price API.
+
+Prints the requested token's price to stdout so other scripts can consume
+it, and can optionally dump the full price map to a JSON file.
+"""
+
+import argparse
+import json
+import sys
+from decimal import Decimal
+
+import requests
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional here
+    orjson = None
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+PRICE_API_URL = (
+    "https://x3fh2qvjtlqvu2zzoa4cxkmriq0nxbmg.lambda-url.us-east-1.on.aws/"
+)
+
+# Shared keep-alive session: repeat price fetches in one process reuse
+# the pooled TLS connection instead of redoing DNS + handshakes, and
+# transient Lambda hiccups retry with backoff.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=4, pool_maxsize=4,
+                max_retries=Retry(total=3, backoff_factor=0.3)),
+)
+
+
+def fetch_prices():
+    """Fetch the full price map from the price API."""
+    response = _SESSION.get(PRICE_API_URL, timeout=(3.05, 10))
+    response.raise_for_status()
+    return response.json()
+
+
+# Magnitude thresholds for price formatting, built once instead of on
+# every call.
+_T_DUST = Decimal("0.0001")
+_T_CENT = Decimal("0.01")
+_T_UNIT = Decimal("1")
+
+
+def format_price(price):
+    """Format a USD price with precision suited to its magnitude."""
+    if not isinstance(price, Decimal):
+        price = Decimal(str(price))
+    if price < _T_DUST:
+        return f"{price:.8f}"
+    if price < _T_CENT:
+        return f"{price:.6f}"
+    if price < _T_UNIT:
+        return f"{price:.4f}"
+    return f"{price:.2f}"
+
+
+def get_price(token_symbol):
+    """Return the USD price for a token symbol as a Decimal.
+
+    Importable entry point so other scripts can call the price logic
+    in-process instead of spawning this script and scraping stdout.
+    """
+    prices = fetch_prices()
+    entry = prices.get(token_symbol.lower())
+    if entry is None:
+        raise KeyError(f"unknown token: {token_symbol}")
+    return Decimal(str(entry["usd"]))
+
+
+def save_to_file(prices, output_file):
+    if orjson is not None:
+        with open(output_file, "wb") as f:
+            f.write(orjson.dumps(prices, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_file, "w") as f:
+            json.dump(prices, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch token USD prices")
+    parser.add_argument("token", nargs="?", default="CXS",
+                        help="token symbol (CXS or NEXTEP)")
+    parser.add_argument("--output", default=None,
+                        help="optionally write the full price map to this file")
+    args = parser.parse_args()
+
+    try:
+        price = get_price(args.token)
+    except KeyError as exc:
+        print(exc.args[0], file=sys.stderr)
+        return 1
+
+    print(f"{args.token} price: {format_price(price)} USD")
+    print(f"price: {price}")
+
+    if args.output:
+        save_to_file(fetch_prices(), args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,683 @@
+#!/usr/bin/env python3
+"""Snapshot NEXTEP (ERC20) balances for every wallet active on the chain.
+
+Crawls the Ethernal transaction API to find every address that ever held
+or moved NEXTEP (direct transfers, transferFrom, MultiSend fan-outs and
+Transfer events), then queries balanceOf for each active wallet. Output
+feeds combine_wallet_values.py alongside the CXS snapshot.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import numpy as np
+import orjson
+import requests
+from eth_abi import abi as eth_abi
+from eth_utils import keccak
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+from urllib3.util.retry import Retry
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - numba is optional
+    njit = None
+
+logger = logging.getLogger("fetch_nextep_balances")
+
+TRANSACTIONS_API_URL = "https://api.tryethernal.com/api/transactions"
+MULTISEND_CONTRACT_ADDRESS = "0x7c6C2BbE58B4B9dB30c82E574562c6AD4aCA5C18"
+NEXTEP_TOKEN_ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+
+# keccak("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+BALANCE_OF_SELECTOR = "0x70a08231"  # balanceOf(address)
+
+_NEXTEP_20 = bytes.fromhex(NEXTEP_TOKEN_ADDRESS[2:])
+_NEXTEP_LC = NEXTEP_TOKEN_ADDRESS.lower()
+_MULTISEND_LC = MULTISEND_CONTRACT_ADDRESS.lower()
+_SEL_TRANSFER = "0xa9059cbb"       # transfer(address,uint256)
+_SEL_TRANSFER_FROM = "0x23b872dd"  # transferFrom(address,address,uint256)
+# Computed once at import; calldata that doesn't carry this selector is
+# not a send() call and skips the decoder entirely.
+_SEND_SELECTOR = "0x" + keccak(
+    text="send(address,uint256[],address[],uint256)")[:4].hex()
+
+NEXTEP_WEI = 10 ** 18
+
+# Canonical Multicall3 deployment; aggregate packs a whole batch of
+# balanceOf calls into a single eth_call.
+DEFAULT_MULTICALL_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+_AGGREGATE_SELECTOR = bytes.fromhex("252dba42")  # aggregate((address,bytes)[])
+
+# One keep-alive session for the whole API crawl: TCP + TLS are set up
+# once instead of per page, and retries with backoff absorb transient
+# errors and 429s.
+_HTTP = requests.Session()
+_HTTP.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=16,
+        max_retries=Retry(total=5, backoff_factor=0.5,
+                          status_forcelist=[429, 500, 502, 503, 504]),
+    ),
+)
+_HTTP.headers.update({"Accept-Encoding": "gzip"})
+
+
+class RateLimiter:
+    """Keep requests below a per-minute cap by spacing them out."""
+
+    def __init__(self, requests_per_minute):
+        self.min_interval = 60.0 / requests_per_minute
+        self.last_request_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait_if_needed(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self.min_interval - (now - self.last_request_time)
+            self.last_request_time = max(now, self.last_request_time
+                                         + self.min_interval)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def wait_if_needed_async(self):
+        """Async variant: spaces request starts while RTTs overlap.
+
+        Same reservation scheme as the sync path — the slot is claimed
+        under the lock before sleeping, so concurrent tasks book
+        successive slots instead of all waking at once, and the
+        timestamp is never updated unlocked.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self.min_interval - (now - self.last_request_time)
+            self.last_request_time = max(now, self.last_request_time
+                                         + self.min_interval)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def fetch_transactions(page, items_per_page, rate_limiter):
+    """Fetch one page of transactions from the Ethernal API."""
+    rate_limiter.wait_if_needed()
+    response = _HTTP.get(
+        TRANSACTIONS_API_URL,
+        params={
+            "page": page,
+            "itemsPerPage": items_per_page,
+            # Projection: the extractor only reads these fields, and the
+            # receipt blobs dominate page size. Servers that don't
+            # support the parameter simply ignore it.
+            "fields": "from,to,input,data,receipt.logs",
+        },
+    )
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+    return data.get("items", [])
+
+
+def fetch_transaction_pages(items_per_page, rpm, prefetch=4):
+    """Yield transaction pages in order while prefetching ahead.
+
+    A small thread pool keeps up to `prefetch` page requests in flight
+    so the network RTT overlaps with extraction in the consumer; pages
+    are still yielded in order and only a bounded window is ever live.
+    The shared rate limiter (now lock-protected) keeps the pool inside
+    the rpm budget.
+    """
+    rate_limiter = RateLimiter(rpm)
+    total = 0
+    with ThreadPoolExecutor(max_workers=prefetch) as executor:
+        futures = {}
+        next_submit = 1
+        next_yield = 1
+        while True:
+            while next_submit < next_yield + prefetch:
+                futures[next_submit] = executor.submit(
+                    fetch_transactions, next_submit, items_per_page,
+                    rate_limiter)
+                next_submit += 1
+            transactions = futures.pop(next_yield).result()
+            if not transactions:
+                for future in futures.values():
+                    future.cancel()
+                break
+            total += len(transactions)
+            logger.info("Fetched page %d (%d transactions total)",
+                        next_yield, total)
+            yield transactions
+            next_yield += 1
+
+
+def fetch_transfer_logs_from_rpc(rpc_url, rpm, span=10_000):
+    """Collect NEXTEP-active wallets straight from eth_getLogs.
+
+    Every transfer path (transfer, transferFrom, MultiSend fan-outs,
+    mints and burns) emits a Transfer event, so one topic-filtered log
+    scan over the chain replaces paging every transaction through the
+    REST API. The node does the filtering; we only see NEXTEP logs.
+    """
+    rate_limiter = RateLimiter(rpm)
+
+    def call(method, params):
+        rate_limiter.wait_if_needed()
+        response = _HTTP.post(rpc_url, json={
+            "jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+        response.raise_for_status()
+        reply = orjson.loads(response.content)
+        if "result" not in reply:
+            raise RuntimeError(reply.get("error", "%s failed" % method))
+        return reply["result"]
+
+    latest = int(call("eth_blockNumber", []), 16)
+    active_wallets = set()
+    add = active_wallets.add
+    for start in tqdm(range(0, latest + 1, span), desc="Scanning logs"):
+        logs = call("eth_getLogs", [{
+            "address": NEXTEP_TOKEN_ADDRESS,
+            "topics": [TRANSFER_TOPIC],
+            "fromBlock": hex(start),
+            "toBlock": hex(min(start + span - 1, latest)),
+        }])
+        for log in logs:
+            topics = log["topics"]
+            if len(topics) >= 3:
+                add(bytes.fromhex(topics[1][26:]))
+                add(bytes.fromhex(topics[2][26:]))
+    active_wallets.discard(b"\x00" * 20)
+    logger.info("Log scan found %d wallets over %d blocks",
+                len(active_wallets), latest + 1)
+    return active_wallets
+
+
+def save_progress(active_wallets, page):
+    """Checkpoint the wallet set and crawl position, not the raw pages."""
+    with open("nextep_wallets_progress.json", "wb") as f:
+        f.write(orjson.dumps({
+            "page": page,
+            "wallets": sorted("0x" + addr.hex() for addr in active_wallets),
+        }))
+
+
+def _addr_bytes(hex_str):
+    """Canonical 20-byte form of a 0x-prefixed (any-case) address."""
+    return bytes.fromhex(hex_str[2:] if hex_str[:2] in ("0x", "0X") else hex_str)
+
+
+_NEXTEP_ARR = np.frombuffer(_NEXTEP_20, dtype=np.uint8)
+
+
+def _parse_multisend_py(buf, token):
+    """Copy NEXTEP MultiSend recipient bytes out of raw calldata.
+
+    `buf` is the calldata with the "0x" prefix and selector stripped;
+    `token` is the expected 20-byte token address. Returns a (n, 20)
+    uint8 array of recipient addresses, empty for non-NEXTEP sends.
+    """
+    empty = np.empty((0, 20), dtype=np.uint8)
+    if not np.array_equal(buf[12:32], token):
+        return empty
+    offset = int.from_bytes(bytes(buf[64:96]), "big")
+    if offset + 32 > len(buf):
+        return empty
+    length = int.from_bytes(bytes(buf[offset:offset + 32]), "big")
+    base = offset + 32
+    if base + length * 32 > len(buf):
+        return empty
+    out = np.empty((length, 20), dtype=np.uint8)
+    for i in range(length):
+        word = base + i * 32
+        out[i, :] = buf[word + 12:word + 32]
+    return out
+
+
+if njit is not None:
+    # LLVM-compiled parse over contiguous uint8 memory; word reads are
+    # unrolled by hand since int.from_bytes is unsupported in nopython
+    # mode. Same kernel shape as the CXS holders script.
+    @njit(cache=True)
+    def _parse_multisend_nb(buf, token):  # pragma: no cover - via numba
+        empty = np.empty((0, 20), dtype=np.uint8)
+        for i in range(20):
+            if buf[12 + i] != token[i]:
+                return empty
+        n = buf.shape[0]
+        offset = 0
+        for i in range(88, 96):  # low 8 bytes of the offset word
+            offset = (offset << 8) | buf[i]
+        if offset + 32 > n:
+            return empty
+        length = 0
+        for i in range(offset + 24, offset + 32):
+            length = (length << 8) | buf[i]
+        base = offset + 32
+        if base + length * 32 > n:
+            return empty
+        out = np.empty((length, 20), dtype=np.uint8)
+        for i in range(length):
+            word = base + i * 32
+            for j in range(20):
+                out[i, j] = buf[word + 12 + j]
+        return out
+
+    _parse_multisend = _parse_multisend_nb
+else:
+    _parse_multisend = _parse_multisend_py
+
+
+def decode_multisend_data(data):
+    """Decode the recipient list from a MultiSend send() call's calldata.
+
+    Layout: word 0 is the token address, word 2 the offset of the
+    destination-address array. Only NEXTEP sends are of interest here.
+
+    The hex payload is converted to bytes once, then _parse_multisend —
+    Numba-compiled when numba is installed, plain Python otherwise —
+    copies the recipient words out of contiguous memory.
+    """
+    # Minimum viable layout: selector + four head words + one-element
+    # recipient array; anything shorter or with a different selector is
+    # some other MultiSend entry point and cannot yield recipients.
+    if not data or len(data) < 330 or not data.startswith(_SEND_SELECTOR):
+        return []
+    try:
+        # Fast reject: convert only the first argument word and memcmp
+        # the token address, so non-NEXTEP sends never pay the hex
+        # conversion of the full (potentially huge) recipient payload.
+        if bytes.fromhex(data[10:74])[12:32] != _NEXTEP_20:
+            return []
+        raw = np.frombuffer(bytes.fromhex(data[10:]), dtype=np.uint8)
+    except ValueError:
+        return []
+    addresses = _parse_multisend(raw, _NEXTEP_ARR)
+    return [addresses[i].tobytes() for i in range(addresses.shape[0])]
+
+
+def update_active_wallets(transactions, active_wallets):
+    """Add every wallet address that ever touched NEXTEP to the set.
+
+    The loop is pure Python over millions of dicts, so every constant is
+    precomputed at module level and method lookups are bound to locals;
+    each address is lowercased at most once per transaction.
+
+    Wallets are kept as 20-byte values: hashing is ~2x faster than on
+    42-char strings, set memory roughly halves, and the 0x-hex form is
+    produced once at serialization time.
+    """
+    add = active_wallets.add
+    update = active_wallets.update
+    # Transfer topics are collected raw and bulk-decoded after the loop:
+    # one contiguous NumPy slice replaces per-log string slicing, and
+    # np.unique collapses repeat addresses before they hit the set.
+    topic_words = []
+    collect = topic_words.append
+    for tx in tqdm(transactions, desc="Extracting wallets"):
+        get = tx.get
+        to_addr = get("to")
+        to_lc = to_addr.lower() if to_addr else ""
+        data = get("input") or get("data") or ""
+
+        if to_lc == _MULTISEND_LC:
+            update(decode_multisend_data(data))
+
+        if to_lc == _NEXTEP_LC:
+            from_addr = get("from")
+            if from_addr:
+                add(_addr_bytes(from_addr))
+            # Calldata is untrusted chain data: require the full
+            # argument words and skip non-hex payloads so a truncated
+            # input can neither raise here nor plant a short value in
+            # the address set.
+            if data.startswith(_SEL_TRANSFER) and len(data) >= 74:
+                try:
+                    args = bytes.fromhex(data[10:74])
+                    add(args[12:32])
+                except ValueError:
+                    pass
+            elif data.startswith(_SEL_TRANSFER_FROM) and len(data) >= 138:
+                try:
+                    args = bytes.fromhex(data[10:138])
+                    add(args[12:32])
+                    add(args[44:64])
+                except ValueError:
+                    pass
+
+        receipt = get("receipt")
+        logs = receipt.get("logs") if receipt else None
+        if not logs:
+            continue
+        # Most transactions touch unrelated contracts; filter down to
+        # NEXTEP-emitted logs in one cheap pass and skip the whole topic
+        # branch when (as usual) there are none.
+        nextep_logs = [log for log in logs
+                       if log.get("address", "").lower() == _NEXTEP_LC]
+        if not nextep_logs:
+            continue
+        for log in nextep_logs:
+            topics = log.get("topics") or []
+            if len(topics) >= 3 and topics[0] == TRANSFER_TOPIC:
+                t1, t2 = topics[1], topics[2]
+                if len(t1) == 66 and len(t2) == 66:
+                    collect(t1)
+                    collect(t2)
+                else:
+                    add(bytes.fromhex(t1[26:]))
+                    add(bytes.fromhex(t2[26:]))
+
+    if topic_words:
+        buf = np.frombuffer("".join(topic_words).encode("ascii"),
+                            dtype=np.uint8)
+        tails = buf.reshape(-1, 66)[:, 26:]
+        for row in np.unique(tails, axis=0):
+            add(bytes.fromhex(row.tobytes().decode("ascii")))
+
+    addresses_to_remove = [b"", b"\x00" * 20]
+    for addr in addresses_to_remove:
+        if addr in active_wallets:
+            active_wallets.remove(addr)
+
+
+# The first 16 bytes of every balanceOf calldata are identical
+# (selector + 12-byte pad), so the whole fixed prefix is one prebuilt
+# template and each call is a single concatenation.
+_BAL_PREFIX = bytes.fromhex(BALANCE_OF_SELECTOR[2:] + "00" * 12)
+
+
+def _encode_balance_call(address):
+    return _BAL_PREFIX + bytes.fromhex(address[2:])
+
+
+async def _fetch_balance_batch_multicall(session, rpc_url, batch,
+                                         multicall_address):
+    """Fetch one batch of balanceOf results with a single eth_call.
+
+    Encodes aggregate((address,bytes)[]) with one balanceOf leaf per
+    address; the node runs all the reads internally and returns the
+    packed results in one response.
+    """
+    calls = [
+        (NEXTEP_TOKEN_ADDRESS, _encode_balance_call(address))
+        for address in batch
+    ]
+    calldata = _AGGREGATE_SELECTOR + eth_abi.encode(
+        ["(address,bytes)[]"], [calls])
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "eth_call",
+        "params": [{"to": multicall_address, "data": "0x" + calldata.hex()},
+                   "latest"],
+    }
+    async with session.post(rpc_url, json=payload) as response:
+        reply = await response.json()
+    if "result" not in reply:
+        raise RuntimeError(reply.get("error", "eth_call failed"))
+    _, return_data = eth_abi.decode(["uint256", "bytes[]"],
+                                    bytes.fromhex(reply["result"][2:]))
+    return [
+        (address, int.from_bytes(word, "big"))
+        for address, word in zip(batch, return_data)
+    ]
+
+
+async def _fetch_balance_batch_rpc(session, rpc_url, batch):
+    """JSON-RPC batch of eth_call requests — fallback without Multicall."""
+    payload = [
+        {
+            "jsonrpc": "2.0",
+            "id": i,
+            "method": "eth_call",
+            "params": [
+                {
+                    "to": NEXTEP_TOKEN_ADDRESS,
+                    "data": "0x" + _encode_balance_call(address).hex(),
+                },
+                "latest",
+            ],
+        }
+        for i, address in enumerate(batch)
+    ]
+    async with session.post(rpc_url, json=payload) as response:
+        replies = await response.json()
+    return [(batch[reply["id"]], int(reply["result"], 16)) for reply in replies]
+
+
+async def _snapshot_block(session, rpc_url):
+    payload = {"jsonrpc": "2.0", "id": 1,
+               "method": "eth_blockNumber", "params": []}
+    async with session.post(rpc_url, json=payload) as response:
+        reply = await response.json()
+    return int(reply["result"], 16)
+
+
+async def _fetch_all_balances(addresses, rpc_url, batch_size, rpm, balances,
+                              output_file, multicall_address, concurrency):
+    rate_limiter = RateLimiter(rpm)
+    state = {"multicall": True}
+    # Keep a fixed number of batches in flight: enough to hide the RTT,
+    # few enough that the node is not buried under hundreds of eth_calls.
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_batch(session, batch):
+        async with semaphore:
+            return await _fetch_batch_limited(session, batch)
+
+    async def _fetch_batch_limited(session, batch):
+        await rate_limiter.wait_if_needed_async()
+        if state["multicall"]:
+            try:
+                return await _fetch_balance_batch_multicall(
+                    session, rpc_url, batch, multicall_address)
+            except Exception as exc:
+                logger.warning("Multicall unavailable (%s); falling back to "
+                               "JSON-RPC batches", exc)
+                state["multicall"] = False
+        return await _fetch_balance_batch_rpc(session, rpc_url, batch)
+
+    connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+    progress_path = output_file + ".ndjson"
+    async with aiohttp.ClientSession(connector=connector) as session:
+        block = await _snapshot_block(session, rpc_url)
+        logger.info("Snapshotting NEXTEP balances at block %d", block)
+
+        # On-disk cache keyed by (block, address): reruns of the same
+        # snapshot skip the RPC entirely for already-seen wallets.
+        db = sqlite3.connect(output_file + ".cache.db")
+        db.execute("CREATE TABLE IF NOT EXISTS balances ("
+                   "block INTEGER NOT NULL, addr TEXT NOT NULL, "
+                   "bal TEXT NOT NULL, PRIMARY KEY (block, addr))")
+        cached = 0
+        for addr, wei in db.execute(
+                "SELECT addr, bal FROM balances WHERE block=?", (block,)):
+            if addr not in balances:
+                balances[addr] = int(wei)
+                cached += 1
+        if cached:
+            logger.info("Loaded %d cached balances", cached)
+
+        remaining = [a for a in addresses if a not in balances]
+        batches = [remaining[i:i + batch_size]
+                   for i in range(0, len(remaining), batch_size)]
+        pending_rows = []
+        tasks = [asyncio.ensure_future(fetch_batch(session, batch))
+                 for batch in batches]
+        # Progress is an append-only line per wallet: O(N) total write
+        # work, instead of re-serializing an ever-growing snapshot every
+        # save_interval addresses (O(N^2) across the run).
+        with open(progress_path, "ab") as progress_log, \
+                tqdm(total=len(remaining), desc="Fetching balances") as progress:
+            for task in asyncio.as_completed(tasks):
+                results = await task
+                for address, balance_wei in results:
+                    balances[address] = balance_wei
+                    progress_log.write(orjson.dumps(
+                        {"addr": address,
+                         "balance_wei": str(balance_wei)}) + b"\n")
+                    pending_rows.append((block, address, str(balance_wei)))
+                if len(pending_rows) >= 1000:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO balances VALUES (?,?,?)",
+                        pending_rows)
+                    db.commit()
+                    pending_rows.clear()
+                progress.update(len(results))
+        if pending_rows:
+            db.executemany("INSERT OR REPLACE INTO balances VALUES (?,?,?)",
+                           pending_rows)
+            db.commit()
+        db.close()
+    os.remove(progress_path)
+    return balances
+
+
+def fetch_nextep_balances(addresses, rpc_url, batch_size, rpm, balances,
+                          output_file,
+                          multicall_address=DEFAULT_MULTICALL_ADDRESS,
+                          concurrency=8):
+    """Fetch NEXTEP balances with concurrent Multicall batches.
+
+    Batches are posted as asyncio tasks over one aiohttp session, so many
+    aggregate eth_call round trips overlap while the shared limiter keeps
+    the start rate within rpm. If the chain has no Multicall deployment
+    the batches fall back to JSON-RPC batches of plain eth_call requests.
+
+    Per-wallet progress streams to an append-only <output>.ndjson log
+    that is removed once the run completes; crashed runs can be
+    recovered from it.
+    """
+    return asyncio.run(_fetch_all_balances(
+        addresses, rpc_url, batch_size, rpm, balances, output_file,
+        multicall_address, concurrency))
+
+
+def _format_wei(wei):
+    """Render an int wei amount as a whole-token decimal string."""
+    whole, frac = divmod(wei, NEXTEP_WEI)
+    if frac == 0:
+        return str(whole)
+    return "{}.{:018d}".format(whole, frac).rstrip("0")
+
+
+def save_balances_to_file(wallet_list, balances, output_file, complete=True):
+    # Balances are plain ints, so the stats are native int sums and the
+    # decimal strings are only rendered here, at emission time.
+    addresses_with_balance = 0
+    total_wei = 0
+    for addr in wallet_list:
+        wei = balances.get(addr)
+        if wei:
+            addresses_with_balance += 1
+            total_wei += wei
+    metadata = {
+        "complete": complete,
+        "token_address": NEXTEP_TOKEN_ADDRESS,
+        "total_wallets": len(wallet_list),
+        "addresses_with_balance": addresses_with_balance,
+        "total_balance": _format_wei(total_wei),
+        "generated_at": int(time.time()),
+    }
+    # Stream the wallets object to disk entry by entry instead of
+    # materializing a second dict of every wallet: peak memory during the
+    # save stays at roughly one entry regardless of wallet count.
+    with open(output_file, "wb") as f:
+        f.write(b'{"metadata":' + orjson.dumps(metadata) + b',"wallets":{')
+        sep = b""
+        for addr in wallet_list:
+            wei = balances.get(addr, 0)
+            entry = {"balance_wei": str(wei), "balance": _format_wei(wei)}
+            f.write(sep + orjson.dumps(addr) + b":" + orjson.dumps(entry))
+            sep = b","
+        f.write(b"}}")
+    logger.info("Saved %d wallets to %s", len(wallet_list), output_file)
+
+
+def save_to_file(active_wallets, output_file):
+    metadata = {
+        "token_address": NEXTEP_TOKEN_ADDRESS,
+        "total_wallets": len(active_wallets),
+        "generated_at": int(time.time()),
+    }
+    with open(output_file, "wb") as f:
+        f.write(b'{"metadata":' + orjson.dumps(metadata) + b',"wallets":[')
+        sep = b""
+        for addr in sorted("0x" + addr.hex() for addr in active_wallets):
+            f.write(sep + orjson.dumps(addr))
+            sep = b","
+        f.write(b"]}")
+    logger.info("Saved %d active wallets to %s", len(active_wallets), output_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch NEXTEP balances of active wallets")
+    parser.add_argument("--rpc-url", default="http://127.0.0.1:9944")
+    parser.add_argument("--multicall-address", default=DEFAULT_MULTICALL_ADDRESS,
+                        help="Multicall3 deployment used to batch balanceOf")
+    parser.add_argument("--items-per-page", type=int, default=1000)
+    parser.add_argument("--api-rpm", type=int, default=120,
+                        help="Ethernal API request budget per minute")
+    parser.add_argument("--rpc-rpm", type=int, default=600,
+                        help="RPC request budget per minute")
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="balanceOf calls per Multicall batch")
+    parser.add_argument("--rpc-concurrency", type=int, default=8,
+                        help="Multicall batches kept in flight at once")
+    parser.add_argument("--output", default="nextep_balances.json")
+    parser.add_argument("--wallets-output", default="nextep_active_wallets.json")
+    parser.add_argument("--scan-receipts", action="store_true",
+                        help="force the Ethernal transaction crawl instead "
+                             "of the eth_getLogs Transfer scan")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    # Preferred discovery path: one topic-filtered eth_getLogs sweep on
+    # the node. The Ethernal receipt crawl remains as a fallback (or via
+    # --scan-receipts) for nodes with pruned or capped log indexes.
+    active_wallets = None
+    if not args.scan_receipts:
+        try:
+            active_wallets = fetch_transfer_logs_from_rpc(
+                args.rpc_url, args.rpc_rpm)
+        except Exception as exc:
+            logger.warning("eth_getLogs scan failed (%s); "
+                           "falling back to the transaction crawl", exc)
+    if active_wallets is None:
+        # Stream pages through the extractor: each page is parsed,
+        # folded into the set, and discarded before the next arrives.
+        active_wallets = set()
+        for page_num, transactions in enumerate(
+                fetch_transaction_pages(args.items_per_page, args.api_rpm),
+                start=1):
+            update_active_wallets(transactions, active_wallets)
+            if page_num % 10 == 0:
+                save_progress(active_wallets, page_num)
+    logger.info("Found %d active wallets", len(active_wallets))
+    save_to_file(active_wallets, args.wallets_output)
+
+    wallet_list = sorted("0x" + addr.hex() for addr in active_wallets)
+    balances = {}
+    fetch_nextep_balances(wallet_list, args.rpc_url, args.batch_size,
+                          args.rpc_rpm, balances, args.output,
+                          args.multicall_address, args.rpc_concurrency)
+    save_balances_to_file(wallet_list, balances, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
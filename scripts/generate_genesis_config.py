@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""Generate a Cosmos-style genesis config from the REVO distribution.
+
+Reads the distribution file produced by calculate_revo_distribution.py
+and emits a genesis.json holding one auth account and one bank balance
+per funded wallet, denominated in arevo (18 decimals).
+"""
+
+import argparse
+import decimal
+import functools
+import gzip
+import itertools
+import json
+import logging
+import logging.handlers
+import mmap
+import multiprocessing
+import operator
+import os
+import sys
+import time
+from decimal import Decimal, getcontext
+
+import ijson
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional here
+    orjson = None
+
+logger = logging.getLogger("generate_genesis_config")
+
+# The remaining Decimal paths assume the libmpdec-backed _decimal
+# module; the pure-Python fallback is orders of magnitude slower and
+# would dominate large runs. Precision is pinned to 40 digits — enough
+# for 18-decimal amounts plus total-supply headroom, and no more, since
+# libmpdec cost grows with the context precision.
+if not hasattr(decimal, "__libmpdec_version__"):  # pragma: no cover
+    logger.warning("decimal is running the pure-Python fallback; install a "
+                   "CPython build with the _decimal (libmpdec) module")
+getcontext().prec = 40
+
+REVO_DECIMALS = 18
+BASE_DENOM = "arevo"
+
+# Distributions up to this size are mmap'd and parsed whole with
+# orjson; anything larger streams through ijson instead.
+_MMAP_PARSE_LIMIT = 1 << 30
+
+DEFAULT_CONSENSUS_PARAMS = {
+    "block": {
+        "max_bytes": "22020096",
+        "max_gas": "81500000",
+    },
+    "evidence": {
+        "max_age_num_blocks": "100000",
+        "max_age_duration": "172800000000000",
+        "max_bytes": "1048576",
+    },
+    "validator": {
+        "pub_key_types": ["ed25519"],
+    },
+    "version": {
+        "app": "0",
+    },
+}
+
+
+def load_revo_distribution(path):
+    """Stream the distribution file: metadata dict plus a wallet iterator.
+
+    ijson parses incrementally, so the wallets object — by far the bulk
+    of the file — never materializes as one giant dict. The returned
+    generator yields (address, wallet_data) pairs straight off the
+    parser, and the config builder folds them in one at a time; peak
+    memory stays at one wallet regardless of distribution size.
+    Metadata sits at the front of the file and is read in a cheap
+    separate pass.
+
+    Files small enough to parse in RAM skip ijson entirely: orjson over
+    an mmap'd buffer parses in one pass with no text-mode codec and no
+    read() copy, which is roughly twice as fast as the event stream.
+    """
+    if orjson is not None and os.path.getsize(path) <= _MMAP_PARSE_LIMIT:
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                data = orjson.loads(memoryview(buf))
+            finally:
+                buf.close()
+        return data.get("metadata", {}), iter(data.get("wallets", {}).items())
+
+    with open(path, "rb") as f:
+        metadata = next(ijson.items(f, "metadata"), {})
+
+    def wallets():
+        with open(path, "rb") as f:
+            yield from ijson.kvitems(f, "wallets")
+
+    return metadata, wallets()
+
+
+def convert_to_base_units(amount, decimals):
+    """Convert a decimal token amount to a base-unit integer string.
+
+    Amounts arrive as decimal strings, so the conversion is pure int
+    arithmetic: split on the point, pad or truncate the fraction to
+    `decimals` digits, and scale the whole part — no Decimal
+    construction or arbitrary-precision multiply per wallet. Decimal
+    (or other numeric) inputs and exponent-notation strings — str() of
+    a float below 1e-4 prints as e.g. "1e-05" — fall back to the exact
+    slow path.
+    """
+    if not isinstance(amount, str) or "e" in amount or "E" in amount:
+        return str(int(Decimal(amount) * Decimal(10) ** Decimal(decimals)))
+    whole, _, frac = amount.partition(".")
+    frac = (frac + "0" * decimals)[:decimals]
+    return str(int(whole or "0") * 10 ** decimals + int(frac or "0"))
+
+
+@functools.lru_cache(maxsize=None)
+def _make_converter(decimals):
+    """Generate a base-unit converter specialized for one decimals value.
+
+    `decimals` is fixed for a run, so the pad string and multiplier are
+    inlined as literals into a generated function — no per-call
+    parameter dispatch or power computation. The small lru_cache on top
+    short-circuits the handful of amounts that repeat across typical
+    airdrop distributions. Returns base units as int.
+    """
+    src = (
+        "def _conv(s):\n"
+        "    whole, _, frac = s.partition('.')\n"
+        "    frac = (frac + '%s')[:%d]\n"
+        "    return int(whole or '0') * %d + int(frac or '0')\n"
+        % ("0" * decimals, decimals, 10 ** decimals)
+    )
+    namespace = {}
+    exec(src, namespace)
+    return functools.lru_cache(maxsize=4096)(namespace["_conv"])
+
+
+def _convert_wallet_batch(batch, decimals, min_base_units=0):
+    """Convert one batch of (address, wallet_data) pairs to records.
+
+    Single fused pass: zero wallets are rejected on the raw string
+    before any number is built, each amount is parsed to base units
+    exactly once and compared against the threshold in the same breath,
+    and each surviving wallet becomes one (address, base_units) record
+    shared by the account and balance emitters. Supply accumulates in
+    base units as a native int. Top-level so it pickles into
+    multiprocessing workers.
+    """
+    records = []
+    total_supply_base = 0
+    append = records.append
+    convert = _make_converter(decimals)
+    for address, wallet_data in batch:
+        revo_tokens = wallet_data["revo_tokens"]
+        # Zero detection on the raw string, catching every spelling
+        # ("0", "0.0", "0.000", "00", ...): with the point removed, a
+        # zero amount is all zeros. Real distributions are full of such
+        # wallets and they skip the base-unit conversion entirely.
+        if not revo_tokens or not revo_tokens.replace(".", "").strip("0"):
+            continue
+        base_units = convert(revo_tokens)
+        if base_units < min_base_units:
+            continue
+        # One canonical str object per address: the shared record
+        # already serves both emitters, and interning dedupes any
+        # repeats arriving from the parser.
+        append((sys.intern(address), base_units))
+        total_supply_base += base_units
+    return records, total_supply_base
+
+
+# Every account and balance entry has the same shape, so entries are
+# rendered from fixed templates around the two varying fields instead
+# of building a ~230-byte dict per record just to serialize it. The
+# records themselves stay minimal (address, base_units) tuples.
+_ACCOUNT_TMPL = ('{"@type":"/cosmos.auth.v1beta1.BaseAccount","address":"%s",'
+                 '"pub_key":null,"account_number":"0","sequence":"0"}')
+_BALANCE_TMPL = ('{"address":"%s","coins":[{"denom":"' + BASE_DENOM
+                 + '","amount":"%d"}]}')
+
+
+def _account_entries(records):
+    for address, _ in records:
+        yield _ACCOUNT_TMPL % address
+
+
+def _balance_entries(records):
+    for address, base_units in records:
+        yield _BALANCE_TMPL % (address, base_units)
+
+
+def _iter_batches(wallets, size=10_000):
+    wallets = iter(wallets)
+    while True:
+        batch = list(itertools.islice(wallets, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _pool_init():
+    # Decimal contexts are per process; workers re-pin the precision.
+    getcontext().prec = 40
+
+
+def generate_genesis_config(wallets, chain_id, decimals=REVO_DECIMALS,
+                            workers=1, min_base_units=0):
+    """Build the genesis dict from an iterator of (address, wallet_data).
+
+    With workers > 1 the conversion fans out over a process pool in
+    10k-wallet batches (imap keeps input order, so output stays
+    deterministic). The integer fast path has made conversion cheap
+    enough that parallelism only pays on very large distributions, so
+    it is opt-in via --workers.
+
+    The accounts and balances entries in the returned dict are
+    generators over one shared record list, expanded per entry by the
+    streaming writer — the full account/balance dicts never coexist in
+    memory, so the dict is single-use: serialize it once.
+    """
+    records = []
+    total_supply_base = 0
+    # Validation is lazy: wallets are counted as batches stream past,
+    # so the loader never materializes the dict just to len() it, and
+    # an empty stream is flagged after the one pass that was happening
+    # anyway.
+    wallets_seen = 0
+
+    def batches():
+        nonlocal wallets_seen
+        for batch in _iter_batches(wallets):
+            wallets_seen += len(batch)
+            yield batch
+
+    if workers > 1:
+        convert = functools.partial(_convert_wallet_batch, decimals=decimals,
+                                    min_base_units=min_base_units)
+        with multiprocessing.Pool(workers, initializer=_pool_init) as pool:
+            for recs, supply in pool.imap(convert, batches()):
+                # Worker-side interning doesn't survive pickling, so
+                # re-intern on the parent as the batches merge.
+                records.extend(
+                    (sys.intern(address), base_units)
+                    for address, base_units in recs)
+                total_supply_base += supply
+    else:
+        for batch in batches():
+            recs, supply = _convert_wallet_batch(batch, decimals,
+                                                 min_base_units)
+            records.extend(recs)
+            total_supply_base += supply
+    if not wallets_seen:
+        logger.warning("distribution stream yielded no wallets; check the "
+                       "input file has a top-level wallets object")
+    # Canonical ordering: one sort by address here, and both emitters
+    # walk the same sorted records, so accounts and balances come out
+    # aligned and downstream tooling never needs to re-sort.
+    records.sort(key=operator.itemgetter(0))
+
+    genesis = {
+        "genesis_time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "chain_id": chain_id,
+        "consensus_params": DEFAULT_CONSENSUS_PARAMS,
+        "app_state": {
+            "auth": {
+                "params": {
+                    "max_memo_characters": "256",
+                    "tx_sig_limit": "7",
+                    "tx_size_cost_per_byte": "10",
+                    "sig_verify_cost_ed25519": "590",
+                    "sig_verify_cost_secp256k1": "1000",
+                },
+                "accounts": _account_entries(records),
+            },
+            "bank": {
+                "params": {
+                    "send_enabled": [],
+                    "default_send_enabled": True,
+                },
+                "balances": _balance_entries(records),
+                "supply": [{
+                    "denom": BASE_DENOM,
+                    "amount": str(total_supply_base),
+                }],
+                "denom_metadata": [{
+                    "description": "The native token of the REVO chain",
+                    "denom_units": [
+                        {"denom": BASE_DENOM, "exponent": 0},
+                        {"denom": "revo", "exponent": decimals},
+                    ],
+                    "base": BASE_DENOM,
+                    "display": "revo",
+                    "name": "REVO",
+                    "symbol": "REVO",
+                }],
+            },
+        },
+    }
+    logger.info("Genesis holds %d of %d wallets, total supply %s %s",
+                len(records), wallets_seen, total_supply_base, BASE_DENOM)
+    return genesis
+
+
+if orjson is not None:
+    def _dumps(obj):
+        return orjson.dumps(obj).decode()
+else:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(",", ":"))
+
+
+# Serialized once at import: the consensus section is static, so the
+# writer can emit these bytes verbatim instead of re-walking the dict
+# on every run of a scripted loop.
+_CONSENSUS_PARAMS_JSON = _dumps(DEFAULT_CONSENSUS_PARAMS)
+
+
+def _write_json_list(f, items):
+    """Write a JSON array one compact element at a time.
+
+    Strings are treated as pre-rendered JSON and written verbatim;
+    anything else goes through the encoder.
+    """
+    f.write("[")
+    sep = ""
+    for item in items:
+        f.write(sep)
+        f.write(item if isinstance(item, str) else _dumps(item))
+        sep = ","
+    f.write("]")
+
+
+def save_genesis_config(genesis_config, output_file):
+    """Stream the genesis JSON instead of buffering one giant dump.
+
+    The accounts and balances arrays carry millions of entries; writing
+    them record by record between a hand-emitted skeleton keeps peak
+    memory at one record, and the 1 MiB file buffer batches the actual
+    write syscalls.
+
+    A .gz output path writes through gzip at level 1: the JSON is
+    mostly repeating structure, so compression shrinks disk I/O far
+    more than the cheap deflate pass costs.
+    """
+    app_state = genesis_config["app_state"]
+    dumps = _dumps
+    if output_file.endswith(".gz"):
+        out = gzip.open(output_file, "wt", encoding="utf-8", compresslevel=1)
+    else:
+        out = open(output_file, "w", buffering=1 << 20)
+    with out as f:
+        f.write('{"genesis_time":' + dumps(genesis_config["genesis_time"]))
+        f.write(',"chain_id":' + dumps(genesis_config["chain_id"]))
+        consensus = genesis_config["consensus_params"]
+        f.write(',"consensus_params":'
+                + (_CONSENSUS_PARAMS_JSON
+                   if consensus is DEFAULT_CONSENSUS_PARAMS
+                   else dumps(consensus)))
+        f.write(',"app_state":{"auth":{"params":'
+                + dumps(app_state["auth"]["params"]))
+        f.write(',"accounts":')
+        _write_json_list(f, app_state["auth"]["accounts"])
+        f.write('},"bank":{"params":' + dumps(app_state["bank"]["params"]))
+        f.write(',"balances":')
+        _write_json_list(f, app_state["bank"]["balances"])
+        f.write(',"supply":' + dumps(app_state["bank"]["supply"]))
+        f.write(',"denom_metadata":'
+                + dumps(app_state["bank"]["denom_metadata"]))
+        f.write("}}}")
+    logger.info("Saved genesis config to %s", output_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a genesis config from the REVO distribution")
+    parser.add_argument("--input", default="revo_distribution.json")
+    parser.add_argument("--output", default="genesis.json")
+    parser.add_argument("--chain-id", default="revo-1")
+    parser.add_argument("--decimals", type=int, default=REVO_DECIMALS)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes for wallet conversion (1 = serial)")
+    parser.add_argument("--min-revo", type=float, default=0.0,
+                        help="drop wallets below this REVO allocation")
+    args = parser.parse_args()
+
+    # The file handler sits behind a MemoryHandler so log records batch
+    # into one write every 10k records (or on the first ERROR) instead
+    # of a flush per line; logging.shutdown drains it at exit.
+    file_handler = logging.FileHandler("generate_genesis_config.log")
+    # basicConfig only formats the handlers it is handed; the wrapped
+    # target needs the formatter set explicitly or the file gets bare
+    # messages.
+    file_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.handlers.MemoryHandler(capacity=10_000,
+                                           flushLevel=logging.ERROR,
+                                           target=file_handler),
+        ],
+    )
+
+    metadata, wallets = load_revo_distribution(args.input)
+    if metadata:
+        logger.info("Distribution generated at %s for %s wallets",
+                    metadata.get("generated_at"), metadata.get("total_wallets"))
+
+    # The threshold folds into the conversion pass itself: each amount
+    # is parsed to base units once and filtered in the same loop, so no
+    # separate filter sweep over the wallet stream.
+    threshold_base = (int(convert_to_base_units(str(args.min_revo),
+                                                args.decimals))
+                      if args.min_revo > 0 else 0)
+
+    genesis_config = generate_genesis_config(wallets, args.chain_id,
+                                             args.decimals, args.workers,
+                                             threshold_base)
+    save_genesis_config(genesis_config, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())